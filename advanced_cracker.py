@@ -4,15 +4,48 @@ import argparse
 import time
 import logging
 import sys
-import os
+import multiprocessing
+import queue
+import mmap
+import itertools
+import math
+import struct
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Callable, Iterable, Iterator, Set, BinaryIO
 from tqdm import tqdm
 from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, wait
 from enum import Enum
-import tempfile
+import io
 import hashlib
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+try:
+    # Compiled key derivation, see setup.py
+    import agile_kdf
+except ImportError:
+    agile_kdf = None
+
+# Candidates derived per KDF call (SIMD lanes of the compiled kernel)
+KDF_LANES = agile_kdf.LANES if agile_kdf is not None else 1
+
+# Passwords per batch handed to a worker
+BATCH_SIZE = 4096
+
+# ECMA-376 limits passwords to 255 characters
+MAX_PASSWORD_LENGTH = 255
+
+# Bloom filters of already tried passwords, one per document hash
+RESUME_DIR = Path('.crack_resume')
+
+# Smallest resume filter started per run, larger lists get one of wordlist bytes / 8
+RESUME_MIN_CAPACITY = 1 << 20
+
+# Wordlist bytes split per pass when streaming from the memory map
+READ_CHUNK_SIZE = 1 << 20
+
+# Attempts counted locally before the shared counter and progress bar see them
+PROGRESS_INTERVAL = 256
 
 # Configure logging
 logging.basicConfig(
@@ -41,25 +74,382 @@ class CrackingStats:
     def __post_init__(self):
         self.errors = []
 
+# Block keys for the password verifier, see [MS-OFFCRYPTO] 2.3.4.13
+BLOCK_KEY_VERIFIER_HASH_INPUT = bytes([0xFE, 0xA7, 0xD2, 0x76, 0x3B, 0x4B, 0x9E, 0x79])
+BLOCK_KEY_VERIFIER_HASH_VALUE = bytes([0xD7, 0xAA, 0x0F, 0x6D, 0x30, 0x61, 0x34, 0x4E])
+
+AES_BLOCK_SIZE = 16
+
+def _decrypt_aes_cbc(data: bytes, key: bytes, iv: bytes) -> bytes:
+    decryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
+    return decryptor.update(data) + decryptor.finalize()
+
+@dataclass(frozen=True)
+class AgileEncryptionInfo:
+    """Password key encryptor of an ECMA-376 Agile encrypted document"""
+    salt: bytes
+    spin_count: int
+    key_bits: int
+    hash_algorithm: str
+    encrypted_verifier_hash_input: bytes
+    encrypted_verifier_hash_value: bytes
+
+    @classmethod
+    def from_office_file(cls, office_file: Any) -> Optional['AgileEncryptionInfo']:
+        """Extract the verifier fields, or None if the file is not Agile encrypted"""
+        if getattr(office_file, 'type', None) != 'agile':
+            return None
+        info = office_file.info
+        return cls(
+            salt=info['passwordSalt'],
+            spin_count=info['spinValue'],
+            key_bits=info['passwordKeyBits'],
+            hash_algorithm=info['passwordHashAlgorithm'],
+            encrypted_verifier_hash_input=info['encryptedVerifierHashInput'],
+            encrypted_verifier_hash_value=info['encryptedVerifierHashValue'],
+        )
+
+    def _hash(self, data: bytes) -> bytes:
+        return hashlib.new(self.hash_algorithm, data).digest()
+
+    def derive_hash(self, password: str) -> bytes:
+        """Iterated password hash, before the block key is mixed in"""
+        h = self._hash(self.salt + password.encode('utf-16-le'))
+        for i in range(self.spin_count):
+            h = self._hash(i.to_bytes(4, 'little') + h)
+        return h
+
+    def verified_passwords(self, passwords: List[bytes]) -> List[bytes]:
+        """Return the raw wordlist entries that pass the verifier, in order"""
+        if agile_kdf is not None and self.hash_algorithm == 'SHA512':
+            # Key derivation and the AES verifier check in one C call; the
+            # extension widens the UTF-8 entries to UTF-16LE itself
+            matches = agile_kdf.verify_batch(
+                self.salt, passwords, self.spin_count,
+                self.key_bits, self.encrypted_verifier_hash_input,
+                self.encrypted_verifier_hash_value)
+            return [passwords[i] for i in matches]
+        return [p for p in passwords
+                if self.check_hash(self.derive_hash(_decode_password(p)))]
+
+    def check_hash(self, h: bytes) -> bool:
+        """Check an iterated password hash against the encrypted verifier"""
+        key_size = self.key_bits // 8
+        verifier_key = self._hash(h + BLOCK_KEY_VERIFIER_HASH_INPUT)[:key_size]
+        verifier_hash_key = self._hash(h + BLOCK_KEY_VERIFIER_HASH_VALUE)[:key_size]
+        expected = self._hash(
+            _decrypt_aes_cbc(self.encrypted_verifier_hash_input, verifier_key, self.salt))
+        # The first CBC block decrypts on its own, so almost every wrong
+        # password is rejected after a single block of the verifier hash
+        encrypted_hash = self.encrypted_verifier_hash_value
+        if _decrypt_aes_cbc(encrypted_hash[:AES_BLOCK_SIZE], verifier_hash_key,
+                            self.salt) != expected[:AES_BLOCK_SIZE]:
+            return False
+        verifier_hash = _decrypt_aes_cbc(encrypted_hash, verifier_hash_key, self.salt)
+        return verifier_hash[:len(expected)] == expected
+
+def _guided_batch_size(remaining: float, workers: int, max_size: int) -> int:
+    """Batch size for the remaining work, a multiple of the KDF lanes"""
+    size = int(remaining) // (2 * workers)
+    size -= size % KDF_LANES
+    return max(KDF_LANES, min(max_size, size))
+
+def _decode_password(password: bytes) -> str:
+    """Decode a raw wordlist entry, dropping bytes that are not valid UTF-8"""
+    return password.decode('utf-8', errors='ignore')
+
+class BloomFilter:
+    """Set of already tried passwords with a bounded false positive rate
+
+    The rate only holds up to the capacity the filter was sized for, so it
+    counts the passwords it holds and reports when it is full.
+    """
+
+    MAGIC = b'BLM2'
+    HEADER = struct.Struct('<4sIQQQ')
+
+    def __init__(self, capacity: int, error_rate: float = 0.01,
+                 bits: Optional[bytearray] = None, num_hashes: Optional[int] = None,
+                 count: int = 0):
+        self.capacity = max(capacity, 1)
+        num_bits = int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.num_hashes = num_hashes or max(1, round(num_bits / self.capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        self.num_bits = len(self.bits) * 8
+        self.count = count
+
+    def _positions(self, item: bytes) -> Iterator[int]:
+        # Double hashing: position i is h1 + i * h2
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: bytes) -> None:
+        new = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                new = True
+        self.count += new
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    def __contains__(self, item: bytes) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def write(self, f: BinaryIO) -> None:
+        f.write(self.HEADER.pack(self.MAGIC, self.num_hashes, self.capacity,
+                                 self.count, len(self.bits)))
+        f.write(self.bits)
+
+    @classmethod
+    def read(cls, data: bytes, offset: int = 0) -> Tuple['BloomFilter', int]:
+        """Parse the filter at offset, returning it and the offset past it"""
+        magic, num_hashes, capacity, count, size = cls.HEADER.unpack_from(data, offset)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a bloom filter")
+        offset += cls.HEADER.size
+        bits = bytearray(data[offset:offset + size])
+        return cls(capacity, bits=bits, num_hashes=num_hashes, count=count), offset + size
+
+class TriedPasswords:
+    """Passwords already tried against one document, kept across runs
+
+    A chain of Bloom filters. Filters loaded from earlier runs are only
+    read, so a run never skips a password because it tried it itself.
+    New passwords go to a filter sized for this run, and a full filter is
+    chained to one twice its size instead of filling up past its capacity.
+    """
+
+    def __init__(self, capacity: int, filters: Iterable[BloomFilter] = ()):
+        self.previous = tuple(filters)
+        self.filters = list(self.previous) + [BloomFilter(capacity)]
+
+    def add(self, item: bytes) -> None:
+        current = self.filters[-1]
+        if current.full:
+            current = BloomFilter(current.capacity * 2)
+            self.filters.append(current)
+        current.add(item)
+
+    def update(self, items: Iterable[bytes]) -> None:
+        for item in items:
+            self.add(item)
+
+    def tried_before(self, item: bytes) -> bool:
+        """Whether an earlier run tried the password"""
+        return any(item in f for f in self.previous)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            for bloom in self.filters:
+                if bloom.count:
+                    bloom.write(f)
+
+    @classmethod
+    def load(cls, path: Path, capacity: int) -> 'TriedPasswords':
+        data = path.read_bytes()
+        filters = []
+        offset = 0
+        while offset < len(data):
+            bloom, offset = BloomFilter.read(data, offset)
+            filters.append(bloom)
+        return cls(capacity, filters)
+
+class FrequencyTable:
+    """Breach corpus password frequencies used to try likely passwords first
+
+    File layout: MAGIC, then per password a score byte, a length byte and
+    the raw password bytes. The score of a count is its bit length capped
+    at BUCKETS - 1, so passwords missing from the table (score 0) rank
+    below every listed one.
+    """
+
+    MAGIC = b'FRQ1'
+    BUCKETS = 32
+
+    def __init__(self, scores: Optional[Dict[bytes, int]] = None):
+        self.scores = scores if scores is not None else {}
+
+    @classmethod
+    def score(cls, count: int) -> int:
+        return min(cls.BUCKETS - 1, max(count, 1).bit_length())
+
+    def add(self, password: bytes, count: int) -> None:
+        self.scores[password] = max(self.scores.get(password, 0), self.score(count))
+
+    def rank(self, passwords: Iterable[bytes]) -> List[bytes]:
+        """Order passwords by descending score in one bucket pass, stable within a score"""
+        buckets: List[List[bytes]] = [[] for _ in range(self.BUCKETS)]
+        get = self.scores.get
+        for p in passwords:
+            buckets[get(p, 0)].append(p)
+        return list(itertools.chain.from_iterable(reversed(buckets)))
+
+    def save(self, path: Path) -> None:
+        with open(path, 'wb') as f:
+            f.write(self.MAGIC)
+            for password, score in self.scores.items():
+                if len(password) <= 0xff:
+                    f.write(struct.pack('<BB', score, len(password)) + password)
+
+    @classmethod
+    def load(cls, path: Path) -> 'FrequencyTable':
+        data = path.read_bytes()
+        if data[:4] != cls.MAGIC:
+            raise ValueError(f"Not a frequency table: {path}")
+        scores = {}
+        offset = 4
+        while offset + 2 <= len(data):
+            score, length = data[offset], data[offset + 1]
+            offset += 2
+            scores[data[offset:offset + length]] = min(score, cls.BUCKETS - 1)
+            offset += length
+        return cls(scores)
+
+class CompiledWordlist:
+    """Preprocessed wordlist that is reused across runs without parsing
+
+    File layout: MAGIC, the record count as u32, then per password a u16
+    length and the raw password bytes, in the order they are tried.
+    Written by tools/compile_wordlist.py.
+    """
+
+    MAGIC = b'WBN\0'
+    HEADER = struct.Struct('<4sI')
+    LENGTH = struct.Struct('<H')
+
+    @classmethod
+    def write(cls, path: Path, passwords: Iterable[bytes]) -> int:
+        count = 0
+        with open(path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, 0))
+            for password in passwords:
+                if len(password) <= 0xffff:
+                    f.write(cls.LENGTH.pack(len(password)) + password)
+                    count += 1
+            f.seek(0)
+            f.write(cls.HEADER.pack(cls.MAGIC, count))
+        return count
+
+    @classmethod
+    def iter_chunks(cls, mm: mmap.mmap) -> Iterator[Tuple[List[bytes], float]]:
+        _, count = cls.HEADER.unpack_from(mm)
+        size = len(mm)
+        offset = cls.HEADER.size
+        unpack_length = cls.LENGTH.unpack_from
+        while offset < size:
+            chunk_end = min(size, offset + READ_CHUNK_SIZE)
+            passwords = []
+            while offset < chunk_end:
+                length, = unpack_length(mm, offset)
+                offset += 2
+                passwords.append(mm[offset:offset + length])
+                offset += length
+            count -= len(passwords)
+            yield passwords, max(count, 0)
+
+def _iter_text_chunks(mm: mmap.mmap) -> Iterator[Tuple[List[bytes], float]]:
+    """Split a text wordlist into filtered chunks, one password per line"""
+    size = len(mm)
+    offset = 0
+    seen: Set[bytes] = set()
+    duplicates = too_long = invalid = 0
+    lines_read = 0
+    while offset < size:
+        # Split a chunk ending on a line boundary in one C call;
+        # only the mapped pages being read stay resident
+        chunk_end = offset + READ_CHUNK_SIZE
+        if chunk_end >= size:
+            end = size
+        else:
+            end = mm.rfind(b'\n', offset, chunk_end)
+            if end < 0:
+                # Line longer than a chunk
+                end = mm.find(b'\n', chunk_end)
+                if end < 0:
+                    end = size
+        lines = mm[offset:end].split(b'\n')
+        offset = end + 1
+        lines_read += len(lines)
+
+        # Drop duplicates and entries too long to be a password,
+        # keeping the wordlist order
+        passwords = []
+        for p in lines:
+            if p.endswith(b'\r'):
+                p = p[:-1]
+            if not p:
+                continue
+            if p in seen:
+                duplicates += 1
+                continue
+            if b'\0' in p:
+                # NUL cannot be part of an OOXML password
+                invalid += 1
+                continue
+            if len(p) > MAX_PASSWORD_LENGTH and len(_decode_password(p)) > MAX_PASSWORD_LENGTH:
+                too_long += 1
+                continue
+            seen.add(p)
+            passwords.append(p)
+
+        # Estimate what is left from the average line length so far
+        yield passwords, max(size - offset, 0) * lines_read / offset
+
+    logging.info(f"Skipped {duplicates} duplicate, {too_long} overlong "
+                 f"and {invalid} invalid passwords")
+
+def iter_wordlist_chunks(path: Path) -> Iterator[Tuple[List[bytes], float]]:
+    """Yield the passwords of each wordlist chunk with an estimate of those left
+
+    Text wordlists are deduplicated and filtered while they are read;
+    compiled ones already are and are read as stored.
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm[:len(CompiledWordlist.MAGIC)] == CompiledWordlist.MAGIC:
+            yield from CompiledWordlist.iter_chunks(mm)
+        else:
+            yield from _iter_text_chunks(mm)
+
 class PasswordCracker:
     def __init__(self, 
                  file_path: str, 
                  wordlist_path: str,
                  mode: CrackingMode = CrackingMode.SINGLE,
                  threads: int = 4,
-                 chunk_size: int = 1000,
                  timeout: int = 3600,
-                 verify_hash: bool = True):
+                 verify_hash: bool = True,
+                 resume: bool = False,
+                 freq_path: Optional[str] = None):
         self.file_path = Path(file_path)
         self.wordlist_path = Path(wordlist_path)
         self.mode = mode
         self.threads = max(1, min(threads, 32))  # Limit threads between 1 and 32
-        self.chunk_size = chunk_size
         self.timeout = timeout
         self.verify_hash = verify_hash
+        self.resume = resume
+        self.freq_path = Path(freq_path) if freq_path else None
         self.stats = CrackingStats()
+        self._encryption_info: Optional[AgileEncryptionInfo] = None
+        self._tried: Optional[TriedPasswords] = None
+        self._document: Optional[msoffcrypto.OfficeFile] = None
+        self._frequencies: Optional[FrequencyTable] = None
         self._validate_inputs()
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # Workers report tried batches back instead of getting a filter copy
+        state = self.__dict__.copy()
+        state['_tried'] = None
+        state['_document'] = None
+        state['_frequencies'] = None
+        return state
+
     def _validate_inputs(self) -> None:
         """Validate input files and parameters"""
         if not self.file_path.exists():
@@ -73,57 +463,93 @@ class PasswordCracker:
 
     def _calculate_file_hash(self) -> str:
         """Calculate document hash for verification"""
-        sha256_hash = hashlib.sha256()
         with open(self.file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+            if hasattr(hashlib, 'file_digest'):
+                return hashlib.file_digest(f, 'sha256').hexdigest()
+            # Python < 3.11: hash through one reusable 1 MiB buffer
+            sha256_hash = hashlib.sha256()
+            buf = memoryview(bytearray(1 << 20))
+            while (n := f.readinto(buf)):
+                sha256_hash.update(buf[:n])
+            return sha256_hash.hexdigest()
+
+    def _load_encryption_info(self) -> Optional[AgileEncryptionInfo]:
+        """Parse the EncryptionInfo stream once so candidates skip the container"""
+        return AgileEncryptionInfo.from_office_file(self._office_file())
+
+    def _office_file(self) -> msoffcrypto.OfficeFile:
+        """Open the document container on first use
+
+        Agile candidates only need the EncryptionInfo parsed by crack(), so
+        workers never parse the container unless a password passes the
+        verifier or the document uses another encryption method.
+        """
+        if self._document is None:
+            self._document = msoffcrypto.OfficeFile(io.BytesIO(self.file_path.read_bytes()))
+        return self._document
+
+    def _decrypt_document(self, password: str) -> bool:
+        """Fully decrypt the document with a password"""
+        office_file = self._office_file()
+        office_file.load_key(password=password)
+        # Decrypt into memory, the plaintext is only needed to verify the key
+        buf = io.BytesIO()
+        office_file.decrypt(buf)
+        # Verify decryption was successful
+        return self.verify_hash and buf.tell() > 0
 
-    def _try_decrypt(self, password: str, office_file: msoffcrypto.OfficeFile) -> bool:
-        """Attempt to decrypt with a single password"""
+    def _confirm_password(self, password: str) -> bool:
+        """Decrypt the package for a password that passed the verifier"""
+        if not self.verify_hash:
+            return True
         try:
-            for encoding in ['utf-8', 'latin1', 'ascii', 'cp1252']:
-                try:
-                    office_file.load_key(password=password)
-                    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                        office_file.decrypt(temp_file)
-                        if self.verify_hash:
-                            # Verify decryption was successful
-                            if os.path.getsize(temp_file.name) > 0:
-                                return True
-                except msoffcrypto.exceptions.InvalidKeyError:
-                    continue
-                except Exception as e:
-                    self.stats.errors.append(f"Error with {encoding}: {str(e)}")
+            return self._decrypt_document(password)
+        except msoffcrypto.exceptions.InvalidKeyError:
             return False
-        finally:
-            if 'temp_file' in locals():
-                os.unlink(temp_file.name)
 
-    def _worker(self, passwords: List[str], progress: tqdm, 
-                shared_data: Dict[str, Any], lock: threading.Lock) -> None:
-        """Worker thread for password testing"""
+    def _try_decrypt_batch(self, passwords: List[bytes]) -> Optional[str]:
+        """Attempt a batch of raw wordlist entries, returning the password that decrypts"""
+        if self._encryption_info is None:
+            for password in map(_decode_password, passwords):
+                if self._try_decrypt(password):
+                    return password
+            return None
+
+        for password in map(_decode_password, self._encryption_info.verified_passwords(passwords)):
+            if self._confirm_password(password):
+                return password
+        return None
+
+    def _try_decrypt(self, password: str) -> bool:
+        """Attempt to decrypt with a single password, for non-Agile documents"""
         try:
-            with open(self.file_path, 'rb') as f:
-                office_file = msoffcrypto.OfficeFile(f)
-                for password in passwords:
-                    if shared_data['found']:
-                        break
-                    
-                    if self._try_decrypt(password, office_file):
-                        with lock:
-                            shared_data['found'] = True
-                            shared_data['password'] = password
-                            progress.write(f"\nPassword found: {password}")
-                        break
-                    
-                    with lock:
-                        self.stats.attempts += 1
-                        progress.update(1)
-                        
-        except Exception as e:
-            logging.error(f"Worker thread error: {str(e)}")
-            self.stats.errors.append(str(e))
+            return self._decrypt_document(password)
+        except msoffcrypto.exceptions.InvalidKeyError:
+            return False
+
+    def _search(self, batches: Iterable[List[bytes]], stop_event: Any,
+                report: Callable[[int], None],
+                batch_done: Optional[Callable[[List[bytes]], None]] = None) -> Optional[str]:
+        """Test password batches until they run out or the search is stopped"""
+        for passwords in batches:
+            tried = 0
+            try:
+                for start in range(0, len(passwords), KDF_LANES):
+                    if stop_event.is_set():
+                        return None
+
+                    batch = passwords[start:start + KDF_LANES]
+                    password = self._try_decrypt_batch(batch)
+                    if password is not None:
+                        report([_decode_password(p) for p in batch].index(password))
+                        return password
+                    report(len(batch))
+                    tried = start + len(batch)
+            finally:
+                # Record the tried part of a batch a stop or Ctrl-C cut short
+                if batch_done is not None and tried:
+                    batch_done(passwords if tried == len(passwords) else passwords[:tried])
+        return None
 
     def crack(self) -> Tuple[Optional[str], float, CrackingStats]:
         """
@@ -135,21 +561,40 @@ class PasswordCracker:
         """
         self.stats = CrackingStats()
         self.stats.start_time = time.time()
+        self._tried = None
         
         try:
-            # Read and preprocess passwords
-            passwords = self._load_passwords()
-            if not passwords:
+            self._encryption_info = self._load_encryption_info()
+            if self.freq_path is not None:
+                self._frequencies = FrequencyTable.load(self.freq_path)
+
+            # Stream and preprocess passwords
+            workers = 1 if self.mode == CrackingMode.SINGLE else self.threads
+            batches = self._iter_password_batches(workers=workers)
+            first_batch = next(batches, None)
+            if first_batch is None:
                 raise ValueError("No valid passwords in wordlist")
+            batches = itertools.chain([first_batch], batches)
+
+            if self.resume:
+                resume_path = self._resume_path()
+                capacity = max(RESUME_MIN_CAPACITY, self.wordlist_path.stat().st_size // 8)
+                self._tried = TriedPasswords(capacity)
+                if resume_path.exists():
+                    try:
+                        self._tried = TriedPasswords.load(resume_path, capacity)
+                    except (ValueError, struct.error):
+                        logging.warning(f"Ignoring unreadable resume file {resume_path}")
+                batches = self._skip_tried(batches)
+
+            logging.info(f"Starting {self.mode.value} mode with wordlist {self.wordlist_path}")
 
-            logging.info(f"Starting {self.mode.value} mode with {len(passwords)} passwords")
-            
             if self.mode == CrackingMode.SINGLE:
-                result = self._crack_single(passwords)
+                result = self._crack_single(batches)
             elif self.mode == CrackingMode.MULTI:
-                result = self._crack_multi(passwords)
+                result = self._crack_multi(batches)
             else:
-                result = self._crack_hybrid(passwords)
+                result = self._crack_hybrid(batches)
 
             self.stats.end_time = time.time()
             self.stats.success = bool(result)
@@ -162,60 +607,239 @@ class PasswordCracker:
             self.stats.errors.append(str(e))
             return None, time.time() - self.stats.start_time, self.stats
 
-    def _load_passwords(self) -> List[str]:
-        """Load and preprocess passwords from wordlist"""
-        passwords = []
-        with open(self.wordlist_path, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                password = line.strip()
-                if password and len(password) >= 1:
-                    passwords.append(password)
-        return passwords
-
-    def _crack_single(self, passwords: List[str]) -> Optional[str]:
+        finally:
+            # Also keep what an interrupted or failed run tried
+            if self._tried is not None:
+                self._tried.save(resume_path)
+
+    def _iter_password_batches(self, batch_size: int = BATCH_SIZE,
+                               workers: int = 1) -> Iterator[List[bytes]]:
+        """Stream preprocessed passwords from the wordlist in bounded batches
+
+        Batches shrink towards the end of the wordlist (guided scheduling),
+        so the last batches are spread over all workers instead of leaving
+        one worker with a long tail. With a frequency table the whole list
+        is read and ranked before the first batch.
+        """
+        chunks: Iterable[Tuple[List[bytes], float]] = iter_wordlist_chunks(self.wordlist_path)
+        if self._frequencies is not None:
+            passwords = self._frequencies.rank(
+                itertools.chain.from_iterable(chunk for chunk, _ in chunks))
+            chunks = [(passwords, 0)]
+
+        pending: List[bytes] = []
+        for passwords, remaining in chunks:
+            pending.extend(passwords)
+            while pending:
+                count = _guided_batch_size(len(pending) + remaining, workers, batch_size)
+                if len(pending) < count and remaining:
+                    break
+                yield pending[:count]
+                del pending[:count]
+
+    def _resume_path(self) -> Path:
+        return RESUME_DIR / f"{self._calculate_file_hash()}.bloom"
+
+    def _skip_tried(self, batches: Iterable[List[bytes]]) -> Iterator[List[bytes]]:
+        """Drop passwords an earlier run already tried against this document"""
+        skipped = 0
+        for batch in batches:
+            remaining = [p for p in batch if not self._tried.tried_before(p)]
+            skipped += len(batch) - len(remaining)
+            if remaining:
+                yield remaining
+        logging.info(f"Skipped {skipped} passwords tried in earlier runs")
+
+    def _produce_batches(self, batches: Iterable[List[bytes]], batch_queue: Any,
+                         stop_event: Any) -> None:
+        """Feed the workers from a background thread, then send one sentinel each"""
+        for batch in itertools.chain(batches, [None] * self.threads):
+            while not stop_event.is_set():
+                try:
+                    batch_queue.put(batch, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                return
+
+    def _crack_single(self, batches: Iterable[List[bytes]]) -> Optional[str]:
         """Single-threaded cracking implementation"""
-        shared_data = {'found': False, 'password': None}
-        with tqdm(total=len(passwords), desc="Testing passwords") as progress:
-            self._worker(passwords, progress, shared_data, threading.Lock())
-        return shared_data['password']
-
-    def _crack_multi(self, passwords: List[str]) -> Optional[str]:
-        """Multi-threaded cracking implementation"""
-        shared_data = {'found': False, 'password': None}
-        lock = threading.Lock()
-        
-        # Split passwords into chunks
-        chunks = [passwords[i:i + self.chunk_size] 
-                 for i in range(0, len(passwords), self.chunk_size)]
-        
-        with tqdm(total=len(passwords), desc="Testing passwords") as progress:
-            with ThreadPoolExecutor(max_workers=self.threads) as executor:
-                futures = [
-                    executor.submit(self._worker, chunk, progress, shared_data, lock)
-                    for chunk in chunks
-                ]
-                
-                # Wait for either completion or timeout
-                for future in futures:
-                    try:
-                        future.result(timeout=self.timeout/len(futures))
-                    except Exception as e:
-                        logging.error(f"Thread error: {str(e)}")
-                        self.stats.errors.append(str(e))
-                        
-        return shared_data['password']
-
-    def _crack_hybrid(self, passwords: List[str]) -> Optional[str]:
-        """Hybrid approach using both methods"""
-        # Try common passwords single-threaded first
-        common_passwords = passwords[:100]
-        result = self._crack_single(common_passwords)
-        if result:
-            return result
-            
-        # Then try remaining passwords multi-threaded
-        remaining_passwords = passwords[100:]
-        return self._crack_multi(remaining_passwords)
+        with tqdm(desc="Testing passwords", unit="pw") as progress:
+            pending = 0
+
+            def flush() -> None:
+                nonlocal pending
+                self.stats.attempts += pending
+                progress.update(pending)
+                pending = 0
+
+            def report(count: int) -> None:
+                nonlocal pending
+                pending += count
+                if pending >= PROGRESS_INTERVAL:
+                    flush()
+
+            try:
+                batch_done = self._tried.update if self._tried is not None else None
+                password = self._search(batches, threading.Event(), report, batch_done)
+            except Exception as e:
+                logging.error(f"Worker error: {str(e)}")
+                self.stats.errors.append(str(e))
+                return None
+            finally:
+                flush()
+            if password is not None:
+                progress.write(f"\nPassword found: {password}")
+        return password
+
+    def _crack_multi(self, batches: Iterable[List[bytes]]) -> Optional[str]:
+        """Multi-process cracking implementation"""
+        ctx = _mp_context()
+        stop_event = ctx.Event()
+        results = ctx.Queue()
+        # One slot per worker, written only by its owner, so no lock is needed
+        attempts = ctx.RawArray('q', self.threads)
+        slots = ctx.Value('i', 0)
+        # Bounded so the wordlist is read only as fast as it is consumed
+        batch_queue = ctx.Queue(maxsize=2 * self.threads)
+        # Completed batches sent back for the resume filter
+        tried_queue = ctx.Queue() if self._tried is not None else None
+        deadline = time.time() + self.timeout
+        password = None
+
+        with tqdm(desc="Testing passwords", unit="pw") as progress:
+            with ProcessPoolExecutor(max_workers=self.threads, mp_context=ctx,
+                                     initializer=_worker_init,
+                                     initargs=(self, batch_queue, stop_event,
+                                               results, attempts, slots,
+                                               tried_queue)) as executor:
+                futures = [executor.submit(_worker) for _ in range(self.threads)]
+                producer = threading.Thread(target=self._produce_batches,
+                                            args=(batches, batch_queue, stop_event),
+                                            daemon=True)
+                producer.start()
+
+                try:
+                    # Poll progress until every worker is done or the timeout hits
+                    while wait(futures, timeout=0.1).not_done:
+                        progress.update(sum(attempts) - progress.n)
+                        self._drain_tried(tried_queue)
+                        if time.time() > deadline and not stop_event.is_set():
+                            logging.error("Timeout reached")
+                            self.stats.errors.append("Timeout reached")
+                            stop_event.set()
+                    progress.update(sum(attempts) - progress.n)
+
+                    for future in futures:
+                        try:
+                            self.stats.errors.extend(future.result())
+                        except Exception as e:
+                            logging.error(f"Worker process error: {str(e)}")
+                            self.stats.errors.append(str(e))
+                finally:
+                    # Stop the producer and the workers on every exit, Ctrl-C
+                    # included; batches nobody will read must not keep the
+                    # queue's feeder thread, and so interpreter exit, waiting
+                    stop_event.set()
+                    producer.join()
+                    batch_queue.cancel_join_thread()
+                    # Workers send their partial batches on the way out
+                    while wait(futures, timeout=0.1).not_done:
+                        self._drain_tried(tried_queue)
+                    self._drain_tried(tried_queue, timeout=0.1)
+
+            try:
+                password = results.get(timeout=1) if not results.empty() else None
+            except queue.Empty:
+                pass
+            if password is not None:
+                progress.write(f"\nPassword found: {password}")
+
+        self.stats.attempts += sum(attempts)
+        return password
+
+    def _drain_tried(self, tried_queue: Any, timeout: float = 0) -> None:
+        """Record batches the workers have finished in the resume filter"""
+        if tried_queue is None:
+            return
+        while True:
+            try:
+                self._tried.update(tried_queue.get(timeout=timeout) if timeout
+                                   else tried_queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _crack_hybrid(self, batches: Iterable[List[bytes]]) -> Optional[str]:
+        """Hybrid approach: common passwords first, then the rest, in one pool"""
+        batches = iter(batches)
+        first_batch = next(batches, [])
+
+        # Spread the common passwords over every worker at the front of the
+        # queue; a hit stops the pool before the rest of the list is tried
+        common_passwords, rest = first_batch[:100], first_batch[100:]
+        size = max(1, -(-len(common_passwords) // self.threads))
+        probe = [common_passwords[i:i + size] for i in range(0, len(common_passwords), size)]
+        return self._crack_multi(itertools.chain(probe, [rest] if rest else [], batches))
+
+# Per-process state of the multi mode workers, set by _worker_init
+_worker_state: Dict[str, Any] = {}
+
+def _mp_context() -> Any:
+    """Fork on Linux so workers inherit the AgileEncryptionInfo and parsed document"""
+    return multiprocessing.get_context('fork' if sys.platform.startswith('linux') else 'spawn')
+
+def _worker_init(cracker: PasswordCracker, batch_queue: Any, stop_event: Any,
+                 results: Any, attempts: Any, slots: Any, tried_queue: Any) -> None:
+    """Process pool initializer for the multi mode workers"""
+    with slots.get_lock():
+        slot = slots.value
+        slots.value += 1
+    _worker_state.update(cracker=cracker, batch_queue=batch_queue,
+                         stop_event=stop_event, results=results, attempts=attempts,
+                         slot=slot, tried_queue=tried_queue)
+
+def _queued_batches(batch_queue: Any, stop_event: Any) -> Iterator[List[bytes]]:
+    """Yield batches from the producer until its sentinel or a stop"""
+    while not stop_event.is_set():
+        try:
+            batch = batch_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if batch is None:
+            return
+        yield batch
+
+def _worker() -> List[str]:
+    """Worker process for password testing, returns the errors it hit"""
+    cracker = _worker_state['cracker']
+    attempts = _worker_state['attempts']
+    slot = _worker_state['slot']
+    cracker.stats.errors = []
+    pending = 0
+
+    def report(count: int) -> None:
+        nonlocal pending
+        pending += count
+        if pending >= PROGRESS_INTERVAL:
+            attempts[slot] += pending
+            pending = 0
+
+    try:
+        stop_event = _worker_state['stop_event']
+        batches = _queued_batches(_worker_state['batch_queue'], stop_event)
+        tried_queue = _worker_state['tried_queue']
+        batch_done = tried_queue.put if tried_queue is not None else None
+        password = cracker._search(batches, stop_event, report, batch_done)
+        if password is not None:
+            _worker_state['results'].put(password)
+            _worker_state['stop_event'].set()
+    except Exception as e:
+        logging.error(f"Worker process error: {str(e)}")
+        cracker.stats.errors.append(str(e))
+    finally:
+        attempts[slot] += pending
+    return cracker.stats.errors
 
 # Example usage:
 def main():
@@ -228,13 +852,15 @@ def main():
                        help="Cracking mode")
     parser.add_argument("-t", "--threads", type=int, default=4,
                        help="Number of threads (1-32)")
-    parser.add_argument("--chunk-size", type=int, default=1000,
-                       help="Password chunk size for threading")
     parser.add_argument("--timeout", type=int, default=3600,
                        help="Timeout in seconds")
     parser.add_argument("--no-verify", action="store_false",
                        dest="verify",
                        help="Skip successful decryption verification")
+    parser.add_argument("--resume", action="store_true",
+                       help="Skip passwords already tried against this document")
+    parser.add_argument("--freq-file",
+                       help="Frequency table to try the most common passwords first")
     
     args = parser.parse_args()
     
@@ -244,9 +870,10 @@ def main():
             args.wordlist,
             mode=CrackingMode(args.mode),
             threads=args.threads,
-            chunk_size=args.chunk_size,
             timeout=args.timeout,
-            verify_hash=args.verify
+            verify_hash=args.verify,
+            resume=args.resume,
+            freq_path=args.freq_file
         )
         
         password, duration, stats = cracker.crack()
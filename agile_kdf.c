@@ -0,0 +1,559 @@
+/*
+ * ECMA-376 Agile password key derivation.
+ *
+ * Runs the spinCount SHA-512 iterations of [MS-OFFCRYPTO] 2.3.4.11 in C so
+ * the hot loop never goes back through the interpreter:
+ *
+ *     H0 = SHA512(salt + password)
+ *     Hn = SHA512(iterator + Hn-1)
+ *
+ * verify_batch() runs independent candidates side by side in AVX2 (4 lanes)
+ * or AVX-512 (8 lanes) registers when the CPU supports it, then checks each
+ * derived key against the AES password verifier.
+ *
+ * Build with: python setup.py build_ext --inplace
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <openssl/evp.h>
+
+#if defined(__GNUC__) && defined(__x86_64__)
+#define HAVE_SIMD_KERNELS 1
+#include <immintrin.h>
+#endif
+
+#define DIGEST_SIZE 64
+#define MAX_LANES 8
+
+static int
+initial_hash(EVP_MD_CTX *ctx, const unsigned char *salt, Py_ssize_t salt_len,
+             const unsigned char *password, Py_ssize_t password_len,
+             unsigned char *out)
+{
+    return EVP_DigestInit_ex(ctx, EVP_sha512(), NULL) &&
+           EVP_DigestUpdate(ctx, salt, salt_len) &&
+           EVP_DigestUpdate(ctx, password, password_len) &&
+           EVP_DigestFinal_ex(ctx, out, NULL);
+}
+
+static int
+derive_sha512(const unsigned char *salt, Py_ssize_t salt_len,
+              const unsigned char *password, Py_ssize_t password_len,
+              unsigned long spin_count, unsigned char *out)
+{
+    EVP_MD_CTX *ctx = EVP_MD_CTX_new();
+    const EVP_MD *md = EVP_sha512();
+    /* 4-byte little-endian iterator followed by the previous digest */
+    unsigned char buf[4 + DIGEST_SIZE];
+    unsigned long i;
+    int ok = 0;
+
+    if (ctx == NULL)
+        return 0;
+
+    if (!initial_hash(ctx, salt, salt_len, password, password_len, buf + 4))
+        goto done;
+
+    for (i = 0; i < spin_count; i++) {
+        buf[0] = (unsigned char)(i & 0xff);
+        buf[1] = (unsigned char)((i >> 8) & 0xff);
+        buf[2] = (unsigned char)((i >> 16) & 0xff);
+        buf[3] = (unsigned char)((i >> 24) & 0xff);
+        if (!EVP_DigestInit_ex(ctx, md, NULL) ||
+            !EVP_DigestUpdate(ctx, buf, sizeof(buf)) ||
+            !EVP_DigestFinal_ex(ctx, buf + 4, NULL))
+            goto done;
+    }
+
+    memcpy(out, buf + 4, DIGEST_SIZE);
+    ok = 1;
+
+done:
+    EVP_MD_CTX_free(ctx);
+    return ok;
+}
+
+#ifdef HAVE_SIMD_KERNELS
+
+static const uint64_t sha512_iv[8] = {
+    0x6a09e667f3bcc908ULL, 0xbb67ae8584caa73bULL, 0x3c6ef372fe94f82bULL,
+    0xa54ff53a5f1d36f1ULL, 0x510e527fade682d1ULL, 0x9b05688c2b3e6c1fULL,
+    0x1f83d9abfb41bd6bULL, 0x5be0cd19137e2179ULL
+};
+
+static const uint64_t sha512_k[80] = {
+    0x428a2f98d728ae22ULL, 0x7137449123ef65cdULL, 0xb5c0fbcfec4d3b2fULL,
+    0xe9b5dba58189dbbcULL, 0x3956c25bf348b538ULL, 0x59f111f1b605d019ULL,
+    0x923f82a4af194f9bULL, 0xab1c5ed5da6d8118ULL, 0xd807aa98a3030242ULL,
+    0x12835b0145706fbeULL, 0x243185be4ee4b28cULL, 0x550c7dc3d5ffb4e2ULL,
+    0x72be5d74f27b896fULL, 0x80deb1fe3b1696b1ULL, 0x9bdc06a725c71235ULL,
+    0xc19bf174cf692694ULL, 0xe49b69c19ef14ad2ULL, 0xefbe4786384f25e3ULL,
+    0x0fc19dc68b8cd5b5ULL, 0x240ca1cc77ac9c65ULL, 0x2de92c6f592b0275ULL,
+    0x4a7484aa6ea6e483ULL, 0x5cb0a9dcbd41fbd4ULL, 0x76f988da831153b5ULL,
+    0x983e5152ee66dfabULL, 0xa831c66d2db43210ULL, 0xb00327c898fb213fULL,
+    0xbf597fc7beef0ee4ULL, 0xc6e00bf33da88fc2ULL, 0xd5a79147930aa725ULL,
+    0x06ca6351e003826fULL, 0x142929670a0e6e70ULL, 0x27b70a8546d22ffcULL,
+    0x2e1b21385c26c926ULL, 0x4d2c6dfc5ac42aedULL, 0x53380d139d95b3dfULL,
+    0x650a73548baf63deULL, 0x766a0abb3c77b2a8ULL, 0x81c2c92e47edaee6ULL,
+    0x92722c851482353bULL, 0xa2bfe8a14cf10364ULL, 0xa81a664bbc423001ULL,
+    0xc24b8b70d0f89791ULL, 0xc76c51a30654be30ULL, 0xd192e819d6ef5218ULL,
+    0xd69906245565a910ULL, 0xf40e35855771202aULL, 0x106aa07032bbd1b8ULL,
+    0x19a4c116b8d2d0c8ULL, 0x1e376c085141ab53ULL, 0x2748774cdf8eeb99ULL,
+    0x34b0bcb5e19b48a8ULL, 0x391c0cb3c5c95a63ULL, 0x4ed8aa4ae3418acbULL,
+    0x5b9cca4f7763e373ULL, 0x682e6ff3d6b2b8a3ULL, 0x748f82ee5defb2fcULL,
+    0x78a5636f43172f60ULL, 0x84c87814a1f0ab72ULL, 0x8cc702081a6439ecULL,
+    0x90befffa23631e28ULL, 0xa4506cebde82bde9ULL, 0xbef9a3f7b2c67915ULL,
+    0xc67178f2e372532bULL, 0xca273eceea26619cULL, 0xd186b8c721c0c207ULL,
+    0xeada7dd6cde0eb1eULL, 0xf57d4f7fee6ed178ULL, 0x06f067aa72176fbaULL,
+    0x0a637dc5a2c898a6ULL, 0x113f9804bef90daeULL, 0x1b710b35131c471bULL,
+    0x28db77f523047d84ULL, 0x32caab7b40c72493ULL, 0x3c9ebe0a15c9bebcULL,
+    0x431d67c49c100d4cULL, 0x4cc5d4becb3e42b6ULL, 0x597f299cfc657e2aULL,
+    0x5fcb6fab3ad6faecULL, 0x6c44198c4a475817ULL
+};
+
+#define bswap32(x) __builtin_bswap32(x)
+#define ROTR64(x, n) (((x) >> (n)) | ((x) << (64 - (n))))
+
+/* AVX2: 4 lanes */
+#define SPIN_FUNC spin_avx2
+#define SPIN_TARGET "avx2"
+#define SPIN_LANES 4
+#define VEC __m256i
+#define V_ADD(a, b) _mm256_add_epi64(a, b)
+#define V_XOR(a, b) _mm256_xor_si256(a, b)
+#define V_AND(a, b) _mm256_and_si256(a, b)
+#define V_ANDNOT(a, b) _mm256_andnot_si256(a, b)
+#define V_OR(a, b) _mm256_or_si256(a, b)
+#define V_SHR(x, n) _mm256_srli_epi64(x, n)
+#define V_SHL(x, n) _mm256_slli_epi64(x, n)
+#define V_ROR(x, n) V_OR(V_SHR(x, n), V_SHL(x, 64 - (n)))
+#define V_SET1(x) _mm256_set1_epi64x((long long)(x))
+#define V_LOAD(p) _mm256_loadu_si256((const __m256i *)(p))
+#define V_STORE(p, v) _mm256_storeu_si256((__m256i *)(p), v)
+#include "agile_kdf_simd.h"
+#undef SPIN_FUNC
+#undef SPIN_TARGET
+#undef SPIN_LANES
+#undef VEC
+#undef V_ADD
+#undef V_XOR
+#undef V_AND
+#undef V_ANDNOT
+#undef V_OR
+#undef V_SHR
+#undef V_SHL
+#undef V_ROR
+#undef V_SET1
+#undef V_LOAD
+#undef V_STORE
+
+/* AVX-512: 8 lanes, native 64-bit rotate */
+#define SPIN_FUNC spin_avx512
+#define SPIN_TARGET "avx512f"
+#define SPIN_LANES 8
+#define VEC __m512i
+#define V_ADD(a, b) _mm512_add_epi64(a, b)
+#define V_XOR(a, b) _mm512_xor_si512(a, b)
+#define V_AND(a, b) _mm512_and_si512(a, b)
+#define V_ANDNOT(a, b) _mm512_andnot_si512(a, b)
+#define V_OR(a, b) _mm512_or_si512(a, b)
+#define V_SHR(x, n) _mm512_srli_epi64(x, n)
+#define V_SHL(x, n) _mm512_slli_epi64(x, n)
+#define V_ROR(x, n) _mm512_ror_epi64(x, n)
+#define V_SET1(x) _mm512_set1_epi64((long long)(x))
+#define V_LOAD(p) _mm512_loadu_si512((const void *)(p))
+#define V_STORE(p, v) _mm512_storeu_si512((void *)(p), v)
+#include "agile_kdf_simd.h"
+#undef SPIN_FUNC
+#undef SPIN_TARGET
+#undef SPIN_LANES
+#undef VEC
+#undef V_ADD
+#undef V_XOR
+#undef V_AND
+#undef V_ANDNOT
+#undef V_OR
+#undef V_SHR
+#undef V_SHL
+#undef V_ROR
+#undef V_SET1
+#undef V_LOAD
+#undef V_STORE
+
+#endif /* HAVE_SIMD_KERNELS */
+
+typedef void (*spin_kernel)(uint64_t *state, unsigned long spin_count);
+
+/* Selected at import time; lanes == 1 means the scalar EVP loop */
+static spin_kernel kernel = NULL;
+static int lanes = 1;
+
+/* UTF-16LE passwords of a batch, back to back in one allocation */
+typedef struct {
+    unsigned char *data;
+    Py_ssize_t *offsets;        /* count + 1 entries */
+    Py_ssize_t count;
+} password_arena;
+
+#define ARENA_PASSWORD(a, n) ((a)->data + (a)->offsets[n])
+#define ARENA_LENGTH(a, n) ((a)->offsets[(n) + 1] - (a)->offsets[n])
+
+static int
+derive_sha512_batch(const unsigned char *salt, Py_ssize_t salt_len,
+                    const password_arena *passwords,
+                    unsigned long spin_count, unsigned char *out)
+{
+    Py_ssize_t count = passwords->count;
+    uint64_t state[8 * MAX_LANES];
+    unsigned char digest[DIGEST_SIZE];
+    EVP_MD_CTX *ctx;
+    Py_ssize_t start, n;
+    int lane, w, b, ok = 0;
+
+    if (kernel == NULL) {
+        for (n = 0; n < count; n++) {
+            if (!derive_sha512(salt, salt_len, ARENA_PASSWORD(passwords, n),
+                               ARENA_LENGTH(passwords, n), spin_count,
+                               out + n * DIGEST_SIZE))
+                return 0;
+        }
+        return 1;
+    }
+
+    ctx = EVP_MD_CTX_new();
+    if (ctx == NULL)
+        return 0;
+
+    for (start = 0; start < count; start += lanes) {
+        memset(state, 0, sizeof(state));
+        for (lane = 0; lane < lanes && start + lane < count; lane++) {
+            if (!initial_hash(ctx, salt, salt_len, ARENA_PASSWORD(passwords, start + lane),
+                              ARENA_LENGTH(passwords, start + lane), digest))
+                goto done;
+            for (w = 0; w < 8; w++) {
+                uint64_t v = 0;
+                for (b = 0; b < 8; b++)
+                    v = (v << 8) | digest[w * 8 + b];
+                state[w * lanes + lane] = v;
+            }
+        }
+
+        kernel(state, spin_count);
+
+        for (lane = 0; lane < lanes && start + lane < count; lane++) {
+            unsigned char *dst = out + (start + lane) * DIGEST_SIZE;
+            for (w = 0; w < 8; w++) {
+                uint64_t v = state[w * lanes + lane];
+                for (b = 7; b >= 0; b--) {
+                    dst[w * 8 + b] = (unsigned char)(v & 0xff);
+                    v >>= 8;
+                }
+            }
+        }
+    }
+    ok = 1;
+
+done:
+    EVP_MD_CTX_free(ctx);
+    return ok;
+}
+
+/* Block keys for the password verifier, see [MS-OFFCRYPTO] 2.3.4.13 */
+static const unsigned char blk_verifier_hash_input[8] = {
+    0xFE, 0xA7, 0xD2, 0x76, 0x3B, 0x4B, 0x9E, 0x79
+};
+static const unsigned char blk_verifier_hash_value[8] = {
+    0xD7, 0xAA, 0x0F, 0x6D, 0x30, 0x61, 0x34, 0x4E
+};
+
+#define AES_BLOCK 16
+#define MAX_VERIFIER 128
+
+static int
+sha512_digest(EVP_MD_CTX *ctx, const unsigned char *data, size_t len,
+              unsigned char *out)
+{
+    return EVP_DigestInit_ex(ctx, EVP_sha512(), NULL) &&
+           EVP_DigestUpdate(ctx, data, len) &&
+           EVP_DigestFinal_ex(ctx, out, NULL);
+}
+
+static int
+aes_cbc_decrypt(EVP_CIPHER_CTX *ctx, const EVP_CIPHER *cipher,
+                const unsigned char *key, const unsigned char *iv,
+                const unsigned char *in, int len, unsigned char *out)
+{
+    int outl, finl;
+    return EVP_DecryptInit_ex(ctx, cipher, NULL, key, iv) &&
+           EVP_CIPHER_CTX_set_padding(ctx, 0) &&
+           EVP_DecryptUpdate(ctx, out, &outl, in, len) &&
+           EVP_DecryptFinal_ex(ctx, out + outl, &finl);
+}
+
+typedef struct {
+    /* AES-CBC of the key size; it reads only that prefix of the SHA-512 key */
+    const EVP_CIPHER *cipher;
+    const unsigned char *iv;
+    const unsigned char *encrypted_input;
+    int input_len;
+    const unsigned char *encrypted_value;
+    int value_len;
+} verifier_params;
+
+/* 1 if the iterated hash h matches the verifier, 0 if not, -1 on error */
+static int
+check_verifier(EVP_MD_CTX *md_ctx, EVP_CIPHER_CTX *cipher_ctx,
+               const verifier_params *p, const unsigned char *h)
+{
+    unsigned char buf[DIGEST_SIZE + 8], key[DIGEST_SIZE];
+    unsigned char verifier[MAX_VERIFIER], expected[DIGEST_SIZE], value[MAX_VERIFIER];
+    int compare_len = p->value_len < DIGEST_SIZE ? p->value_len : DIGEST_SIZE;
+
+    memcpy(buf, h, DIGEST_SIZE);
+    memcpy(buf + DIGEST_SIZE, blk_verifier_hash_input, 8);
+    if (!sha512_digest(md_ctx, buf, sizeof(buf), key) ||
+        !aes_cbc_decrypt(cipher_ctx, p->cipher, key, p->iv,
+                         p->encrypted_input, p->input_len, verifier) ||
+        !sha512_digest(md_ctx, verifier, p->input_len, expected))
+        return -1;
+
+    memcpy(buf + DIGEST_SIZE, blk_verifier_hash_value, 8);
+    if (!sha512_digest(md_ctx, buf, sizeof(buf), key) ||
+        !aes_cbc_decrypt(cipher_ctx, p->cipher, key, p->iv,
+                         p->encrypted_value, AES_BLOCK, value))
+        return -1;
+    /* The first CBC block rejects almost every wrong password */
+    if (memcmp(value, expected, AES_BLOCK) != 0)
+        return 0;
+
+    if (!aes_cbc_decrypt(cipher_ctx, p->cipher, key, p->iv,
+                         p->encrypted_value, p->value_len, value))
+        return -1;
+    return memcmp(value, expected, compare_len) == 0;
+}
+
+/*
+ * Fill the arena from a sequence of UTF-8 wordlist entries. ASCII entries,
+ * the common case, are widened to UTF-16LE here by interleaving zero bytes;
+ * anything else goes through the CPython codecs with invalid bytes ignored.
+ * UTF-16LE never needs more than twice the UTF-8 length.
+ */
+static int
+load_passwords(PyObject *passwords, password_arena *arena)
+{
+    PyObject *seq;
+    Py_ssize_t n, total = 0, pos = 0;
+    int ok = 0;
+
+    memset(arena, 0, sizeof(*arena));
+    seq = PySequence_Fast(passwords, "passwords must be a sequence");
+    if (seq == NULL)
+        return 0;
+    arena->count = PySequence_Fast_GET_SIZE(seq);
+
+    for (n = 0; n < arena->count; n++) {
+        PyObject *item = PySequence_Fast_GET_ITEM(seq, n);
+        if (!PyBytes_Check(item)) {
+            PyErr_SetString(PyExc_TypeError, "passwords must be bytes");
+            goto done;
+        }
+        total += 2 * PyBytes_GET_SIZE(item);
+    }
+
+    arena->data = PyMem_Malloc(total ? total : 1);
+    arena->offsets = PyMem_Malloc((arena->count + 1) * sizeof(Py_ssize_t));
+    if (arena->data == NULL || arena->offsets == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+
+    for (n = 0; n < arena->count; n++) {
+        PyObject *item = PySequence_Fast_GET_ITEM(seq, n);
+        const unsigned char *src = (const unsigned char *)PyBytes_AS_STRING(item);
+        Py_ssize_t len = PyBytes_GET_SIZE(item), i;
+        int ascii = 1;
+
+        arena->offsets[n] = pos;
+        for (i = 0; i < len; i++) {
+            if (src[i] & 0x80) {
+                ascii = 0;
+                break;
+            }
+        }
+
+        if (ascii) {
+            for (i = 0; i < len; i++) {
+                arena->data[pos++] = src[i];
+                arena->data[pos++] = 0;
+            }
+        } else {
+            PyObject *text, *encoded;
+            text = PyUnicode_DecodeUTF8((const char *)src, len, "ignore");
+            if (text == NULL)
+                goto done;
+            encoded = PyUnicode_AsEncodedString(text, "utf-16-le", NULL);
+            Py_DECREF(text);
+            if (encoded == NULL)
+                goto done;
+            memcpy(arena->data + pos, PyBytes_AS_STRING(encoded),
+                   PyBytes_GET_SIZE(encoded));
+            pos += PyBytes_GET_SIZE(encoded);
+            Py_DECREF(encoded);
+        }
+    }
+    arena->offsets[arena->count] = pos;
+    ok = 1;
+
+done:
+    Py_DECREF(seq);
+    return ok;
+}
+
+static void
+free_passwords(password_arena *arena)
+{
+    PyMem_Free(arena->data);
+    PyMem_Free(arena->offsets);
+}
+
+PyDoc_STRVAR(verify_batch_doc,
+"verify_batch(salt, passwords, spin_count, key_bits,\n"
+"             encrypted_verifier_hash_input, encrypted_verifier_hash_value) -> list[int]\n\n"
+"Derive keys for a sequence of UTF-8 passwords and return the indices of those that\n"
+"pass the AES password verifier. AES runs through OpenSSL EVP (AES-NI).");
+
+static PyObject *
+agile_kdf_verify_batch(PyObject *self, PyObject *args)
+{
+    Py_buffer salt, encrypted_input, encrypted_value;
+    PyObject *passwords, *result = NULL;
+    password_arena arena = {NULL, NULL, 0};
+    unsigned char *out = NULL;
+    char *matches = NULL;
+    unsigned long spin_count;
+    int key_bits, ok = 1;
+    Py_ssize_t count, n;
+    verifier_params params;
+    EVP_MD_CTX *md_ctx = NULL;
+    EVP_CIPHER_CTX *cipher_ctx = NULL;
+
+    if (!PyArg_ParseTuple(args, "y*Okiy*y*:verify_batch", &salt, &passwords,
+                          &spin_count, &key_bits, &encrypted_input, &encrypted_value))
+        return NULL;
+
+    switch (key_bits) {
+    case 128: params.cipher = EVP_aes_128_cbc(); break;
+    case 192: params.cipher = EVP_aes_192_cbc(); break;
+    case 256: params.cipher = EVP_aes_256_cbc(); break;
+    default:
+        PyErr_SetString(PyExc_ValueError, "key_bits must be 128, 192 or 256");
+        goto done;
+    }
+    if (salt.len < AES_BLOCK ||
+        encrypted_input.len % AES_BLOCK || encrypted_input.len == 0 ||
+        encrypted_input.len > MAX_VERIFIER ||
+        encrypted_value.len % AES_BLOCK || encrypted_value.len == 0 ||
+        encrypted_value.len > MAX_VERIFIER) {
+        PyErr_SetString(PyExc_ValueError, "unexpected verifier sizes");
+        goto done;
+    }
+    params.iv = salt.buf;
+    params.encrypted_input = encrypted_input.buf;
+    params.input_len = (int)encrypted_input.len;
+    params.encrypted_value = encrypted_value.buf;
+    params.value_len = (int)encrypted_value.len;
+
+    if (!load_passwords(passwords, &arena))
+        goto done;
+    count = arena.count;
+    out = PyMem_Malloc((count ? count : 1) * DIGEST_SIZE);
+    matches = PyMem_Calloc(count ? count : 1, 1);
+    md_ctx = EVP_MD_CTX_new();
+    cipher_ctx = EVP_CIPHER_CTX_new();
+    if (out == NULL || matches == NULL || md_ctx == NULL || cipher_ctx == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    ok = derive_sha512_batch(salt.buf, salt.len, &arena, spin_count, out);
+    for (n = 0; ok && n < count; n++) {
+        int r = check_verifier(md_ctx, cipher_ctx, &params, out + n * DIGEST_SIZE);
+        if (r < 0)
+            ok = 0;
+        matches[n] = r > 0;
+    }
+    Py_END_ALLOW_THREADS
+
+    if (!ok) {
+        PyErr_SetString(PyExc_RuntimeError, "OpenSSL verifier check failed");
+        goto done;
+    }
+
+    result = PyList_New(0);
+    for (n = 0; result != NULL && n < count; n++) {
+        if (matches[n]) {
+            PyObject *index = PyLong_FromSsize_t(n);
+            if (index == NULL || PyList_Append(result, index) < 0)
+                Py_CLEAR(result);
+            Py_XDECREF(index);
+        }
+    }
+
+done:
+    free_passwords(&arena);
+    PyMem_Free(out);
+    PyMem_Free(matches);
+    EVP_MD_CTX_free(md_ctx);
+    EVP_CIPHER_CTX_free(cipher_ctx);
+    PyBuffer_Release(&salt);
+    PyBuffer_Release(&encrypted_input);
+    PyBuffer_Release(&encrypted_value);
+    return result;
+}
+
+static PyMethodDef agile_kdf_methods[] = {
+    {"verify_batch", agile_kdf_verify_batch, METH_VARARGS, verify_batch_doc},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef agile_kdf_module = {
+    PyModuleDef_HEAD_INIT,
+    "agile_kdf",
+    "ECMA-376 Agile password key derivation",
+    -1,
+    agile_kdf_methods
+};
+
+PyMODINIT_FUNC
+PyInit_agile_kdf(void)
+{
+    PyObject *module = PyModule_Create(&agile_kdf_module);
+    if (module == NULL)
+        return NULL;
+
+#ifdef HAVE_SIMD_KERNELS
+    /* AGILE_KDF_LANES caps the kernel width, so tests can run every kernel */
+    const char *max_lanes_env = getenv("AGILE_KDF_LANES");
+    int max_lanes = max_lanes_env != NULL && *max_lanes_env ? atoi(max_lanes_env) : MAX_LANES;
+
+    __builtin_cpu_init();
+    if (max_lanes >= 8 && __builtin_cpu_supports("avx512f")) {
+        kernel = spin_avx512;
+        lanes = 8;
+    } else if (max_lanes >= 4 && __builtin_cpu_supports("avx2")) {
+        kernel = spin_avx2;
+        lanes = 4;
+    }
+#endif
+
+    /* Candidates per kernel call in verify_batch() */
+    if (PyModule_AddIntConstant(module, "LANES", lanes) < 0) {
+        Py_DECREF(module);
+        return NULL;
+    }
+    return module;
+}
@@ -0,0 +1,129 @@
+/*
+ * Multi-lane SHA-512 spin loop, included by agile_kdf.c once per
+ * instruction set. The includer defines:
+ *
+ *   SPIN_FUNC       name of the generated function
+ *   SPIN_TARGET     GCC target attribute string
+ *   SPIN_LANES      64-bit lanes per vector
+ *   VEC             vector type
+ *   V_ADD, V_XOR, V_AND, V_ANDNOT(a, b) = ~a & b, V_OR, V_ROR(x, n),
+ *   V_SHR(x, n), V_SHL(x, n), V_SET1(u64), V_LOAD(ptr), V_STORE(ptr, v)
+ *
+ * Every lane hashes its own password; the iterator is identical across
+ * lanes so it is broadcast into the first message word.
+ */
+
+#define S_SIGMA0(x) V_XOR(V_XOR(V_ROR(x, 28), V_ROR(x, 34)), V_ROR(x, 39))
+#define S_SIGMA1(x) V_XOR(V_XOR(V_ROR(x, 14), V_ROR(x, 18)), V_ROR(x, 41))
+#define S_GAMMA0(x) V_XOR(V_XOR(V_ROR(x, 1), V_ROR(x, 8)), V_SHR(x, 7))
+#define S_GAMMA1(x) V_XOR(V_XOR(V_ROR(x, 19), V_ROR(x, 61)), V_SHR(x, 6))
+#define S_CH(x, y, z) V_XOR(V_AND(x, y), V_ANDNOT(x, z))
+#define S_MAJ(x, y, z) V_XOR(V_XOR(V_AND(x, y), V_AND(x, z)), V_AND(y, z))
+
+#define S_ROUND(a, b, c, d, e, f, g, h, kw) do { \
+        VEC t1_ = V_ADD(V_ADD(h, S_SIGMA1(e)), V_ADD(S_CH(e, f, g), kw)); \
+        d = V_ADD(d, t1_); \
+        h = V_ADD(t1_, V_ADD(S_SIGMA0(a), S_MAJ(a, b, c))); \
+    } while (0)
+
+/* Eight rounds with the working variables renamed instead of shifted */
+#define S_ROUNDS8(t) do { \
+        S_ROUND(a, b, c, d, e, f, g, hh, kw[(t) + 0]); \
+        S_ROUND(hh, a, b, c, d, e, f, g, kw[(t) + 1]); \
+        S_ROUND(g, hh, a, b, c, d, e, f, kw[(t) + 2]); \
+        S_ROUND(f, g, hh, a, b, c, d, e, kw[(t) + 3]); \
+        S_ROUND(e, f, g, hh, a, b, c, d, kw[(t) + 4]); \
+        S_ROUND(d, e, f, g, hh, a, b, c, kw[(t) + 5]); \
+        S_ROUND(c, d, e, f, g, hh, a, b, kw[(t) + 6]); \
+        S_ROUND(b, c, d, e, f, g, hh, a, kw[(t) + 7]); \
+    } while (0)
+
+#define S_W(t) V_ADD(V_ADD(S_GAMMA1(w[(t) - 2]), w[(t) - 7]), \
+                     V_ADD(S_GAMMA0(w[(t) - 15]), w[(t) - 16]))
+
+/*
+ * state: 8 x SPIN_LANES words, word-major (state[w * SPIN_LANES + lane]),
+ * holding H0 on entry and the final hash on return.
+ *
+ * The message of every iteration is the iterator (4 bytes LE) + the
+ * previous digest (64 bytes), padded to a single 128-byte block. Words
+ * 9-14 of that block are always zero and word 15 is the constant bit
+ * length, so their terms are folded out of the first rounds and the
+ * message schedule below.
+ */
+__attribute__((target(SPIN_TARGET))) static void
+SPIN_FUNC(uint64_t *state, unsigned long spin_count)
+{
+    const uint64_t len = (4 + DIGEST_SIZE) * 8;
+    /* gamma0/gamma1 of the length word */
+    const uint64_t g0_len = ROTR64(len, 1) ^ ROTR64(len, 8) ^ (len >> 7);
+    const uint64_t g1_len = ROTR64(len, 19) ^ ROTR64(len, 61) ^ (len >> 6);
+    VEC h[8], w[80], kw[80];
+    unsigned long i;
+    int t;
+
+    for (t = 0; t < 8; t++)
+        h[t] = V_LOAD(state + t * SPIN_LANES);
+
+    for (i = 0; i < spin_count; i++) {
+        VEC a, b, c, d, e, f, g, hh;
+        uint64_t counter = (uint64_t)bswap32((uint32_t)i) << 32;
+
+        w[0] = V_OR(V_SET1(counter), V_SHR(h[0], 32));
+        for (t = 1; t < 8; t++)
+            w[t] = V_OR(V_SHL(h[t - 1], 32), V_SHR(h[t], 32));
+        w[8] = V_OR(V_SHL(h[7], 32), V_SET1(0x80000000ULL));
+
+        /* Schedule with the zero words 9-14 and the length word 15 folded in */
+        w[16] = V_ADD(S_GAMMA0(w[1]), w[0]);
+        w[17] = V_ADD(V_ADD(S_GAMMA0(w[2]), w[1]), V_SET1(g1_len));
+        w[18] = V_ADD(V_ADD(S_GAMMA1(w[16]), S_GAMMA0(w[3])), w[2]);
+        w[19] = V_ADD(V_ADD(S_GAMMA1(w[17]), S_GAMMA0(w[4])), w[3]);
+        w[20] = V_ADD(V_ADD(S_GAMMA1(w[18]), S_GAMMA0(w[5])), w[4]);
+        w[21] = V_ADD(V_ADD(S_GAMMA1(w[19]), S_GAMMA0(w[6])), w[5]);
+        w[22] = V_ADD(V_ADD(S_GAMMA1(w[20]), V_SET1(len)), V_ADD(S_GAMMA0(w[7]), w[6]));
+        w[23] = V_ADD(V_ADD(S_GAMMA1(w[21]), w[16]), V_ADD(S_GAMMA0(w[8]), w[7]));
+        w[24] = V_ADD(V_ADD(S_GAMMA1(w[22]), w[17]), w[8]);
+        for (t = 25; t < 30; t++)
+            w[t] = V_ADD(S_GAMMA1(w[t - 2]), w[t - 7]);
+        w[30] = V_ADD(V_ADD(S_GAMMA1(w[28]), w[23]), V_SET1(g0_len));
+        w[31] = V_ADD(V_ADD(S_GAMMA1(w[29]), w[24]), V_ADD(S_GAMMA0(w[16]), V_SET1(len)));
+        for (t = 32; t < 80; t++)
+            w[t] = S_W(t);
+
+        for (t = 0; t < 9; t++)
+            kw[t] = V_ADD(V_SET1(sha512_k[t]), w[t]);
+        for (t = 9; t < 15; t++)
+            kw[t] = V_SET1(sha512_k[t]);
+        kw[15] = V_SET1(sha512_k[15] + len);
+        for (t = 16; t < 80; t++)
+            kw[t] = V_ADD(V_SET1(sha512_k[t]), w[t]);
+
+        a = V_SET1(sha512_iv[0]); b = V_SET1(sha512_iv[1]);
+        c = V_SET1(sha512_iv[2]); d = V_SET1(sha512_iv[3]);
+        e = V_SET1(sha512_iv[4]); f = V_SET1(sha512_iv[5]);
+        g = V_SET1(sha512_iv[6]); hh = V_SET1(sha512_iv[7]);
+
+        S_ROUNDS8(0);  S_ROUNDS8(8);  S_ROUNDS8(16); S_ROUNDS8(24);
+        S_ROUNDS8(32); S_ROUNDS8(40); S_ROUNDS8(48); S_ROUNDS8(56);
+        S_ROUNDS8(64); S_ROUNDS8(72);
+
+        h[0] = V_ADD(a, V_SET1(sha512_iv[0])); h[1] = V_ADD(b, V_SET1(sha512_iv[1]));
+        h[2] = V_ADD(c, V_SET1(sha512_iv[2])); h[3] = V_ADD(d, V_SET1(sha512_iv[3]));
+        h[4] = V_ADD(e, V_SET1(sha512_iv[4])); h[5] = V_ADD(f, V_SET1(sha512_iv[5]));
+        h[6] = V_ADD(g, V_SET1(sha512_iv[6])); h[7] = V_ADD(hh, V_SET1(sha512_iv[7]));
+    }
+
+    for (t = 0; t < 8; t++)
+        V_STORE(state + t * SPIN_LANES, h[t]);
+}
+
+#undef S_SIGMA0
+#undef S_SIGMA1
+#undef S_GAMMA0
+#undef S_GAMMA1
+#undef S_CH
+#undef S_MAJ
+#undef S_ROUND
+#undef S_ROUNDS8
+#undef S_W
@@ -238,7 +238,6 @@ class MainWindow(QMainWindow):
         wordlist = "../wordlist.txt"
         mode = self.ui.comboBox.currentText().split(" ")[0].lower()
         threads = 4
-        chunk_size = 1000
         timeout = 3600
         verify_hash = True
 
@@ -248,7 +247,6 @@ class MainWindow(QMainWindow):
                 wordlist,
                 mode=CrackingMode(mode),
                 threads=threads,
-                chunk_size=chunk_size,
                 timeout=timeout,
                 verify_hash=verify_hash
             )
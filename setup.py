@@ -0,0 +1,18 @@
+import sys
+from setuptools import setup, Extension
+
+# Builds the optional key derivation extension used by advanced_cracker.py:
+#   python setup.py build_ext --inplace
+setup(
+    name="agile_kdf",
+    version="1.0",
+    description="ECMA-376 Agile password key derivation",
+    ext_modules=[
+        Extension(
+            "agile_kdf",
+            sources=["agile_kdf.c"],
+            depends=["agile_kdf_simd.h"],
+            libraries=["libcrypto" if sys.platform == "win32" else "crypto"],
+        )
+    ],
+)
@@ -0,0 +1,64 @@
+"""End-to-end cracking of test/test.docx"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from advanced_cracker import CrackingMode, PasswordCracker
+
+DOCUMENT = Path(__file__).with_name('test.docx')
+PASSWORD = '@123711...'
+
+
+class CrackTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.wordlist = Path(directory.name) / 'wordlist.txt'
+
+    def crack(self, mode, passwords):
+        self.wordlist.write_text('\n'.join(passwords) + '\n', encoding='utf-8')
+        cracker = PasswordCracker(str(DOCUMENT), str(self.wordlist), mode=mode, threads=2)
+        return cracker.crack()
+
+    def test_single(self):
+        password, _, stats = self.crack(CrackingMode.SINGLE, ['wrong', 'pässwörd', PASSWORD, 'after'])
+        self.assertEqual(password, PASSWORD)
+        self.assertTrue(stats.success)
+
+    def test_multi(self):
+        words = [f'wrong{i}' for i in range(40)] + [PASSWORD]
+        password, _, stats = self.crack(CrackingMode.MULTI, words)
+        self.assertEqual(password, PASSWORD)
+        self.assertTrue(stats.success)
+
+    def test_multi_exits_with_unread_batches(self):
+        # More batches than the queue's pipe buffer holds are still unread
+        # when the hit stops the workers
+        words = [PASSWORD] + [f'wrong{i}' for i in range(20000)]
+        self.wordlist.write_text('\n'.join(words) + '\n', encoding='utf-8')
+        for mode in (CrackingMode.MULTI, CrackingMode.HYBRID):
+            with self.subTest(mode=mode):
+                script = (f"from advanced_cracker import CrackingMode, PasswordCracker\n"
+                          f"cracker = PasswordCracker({str(DOCUMENT)!r}, {str(self.wordlist)!r}, "
+                          f"mode=CrackingMode({mode.value!r}), threads=2)\n"
+                          f"print(cracker.crack()[0])\n")
+                result = subprocess.run([sys.executable, '-c', script], cwd=self.wordlist.parent,
+                                        env=dict(os.environ, PYTHONPATH=str(ROOT)), capture_output=True,
+                                        text=True, timeout=30)
+                self.assertEqual(result.returncode, 0, result.stderr)
+                self.assertEqual(result.stdout.splitlines()[-1], PASSWORD)
+
+    def test_not_found(self):
+        password, _, stats = self.crack(CrackingMode.SINGLE, ['wrong', 'also wrong'])
+        self.assertIsNone(password)
+        self.assertFalse(stats.success)
+
+
+if __name__ == '__main__':
+    unittest.main()
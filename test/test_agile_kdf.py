@@ -0,0 +1,98 @@
+"""Check the agile_kdf extension against a hashlib reference
+
+Every kernel the CPU supports is run: the default one in this process and
+the narrower ones in subprocesses started with AGILE_KDF_LANES.
+"""
+import hashlib
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+try:
+    import agile_kdf
+except ImportError:
+    agile_kdf = None
+
+SALT = bytes(range(16))
+VERIFIER_INPUT = b'verifier input!!'
+BLOCK_KEY_INPUT = bytes([0xfe, 0xa7, 0xd2, 0x76, 0x3b, 0x4b, 0x9e, 0x79])
+BLOCK_KEY_VALUE = bytes([0xd7, 0xaa, 0x0f, 0x6d, 0x30, 0x61, 0x34, 0x4e])
+
+# Not a multiple of any kernel width, with non-ASCII, empty and long entries
+PASSWORDS = [
+    b'password', b'', 'pässwörd'.encode(), '密码123'.encode(), b'a' * 300,
+    b'@123711...', 'ключ'.encode(), b'x', 'é'.encode() * 150,
+]
+SPIN_COUNTS = [0, 1, 7, 1000]
+
+
+def reference_hash(password, spin_count):
+    h = hashlib.sha512(SALT + password.decode('utf-8').encode('utf-16-le')).digest()
+    for i in range(spin_count):
+        h = hashlib.sha512(i.to_bytes(4, 'little') + h).digest()
+    return h
+
+
+def encrypt(key, data):
+    encryptor = Cipher(algorithms.AES(key), modes.CBC(SALT)).encryptor()
+    return encryptor.update(data) + encryptor.finalize()
+
+
+def make_verifier(h, key_bits):
+    """Encrypted verifier hash input and value for an iterated password hash"""
+    key_size = key_bits // 8
+    input_key = hashlib.sha512(h + BLOCK_KEY_INPUT).digest()[:key_size]
+    value_key = hashlib.sha512(h + BLOCK_KEY_VALUE).digest()[:key_size]
+    return (encrypt(input_key, VERIFIER_INPUT),
+            encrypt(value_key, hashlib.sha512(VERIFIER_INPUT).digest()))
+
+
+@unittest.skipIf(agile_kdf is None, "agile_kdf extension not built")
+class VerifyBatchTest(unittest.TestCase):
+    def test_matches_hashlib(self):
+        for spin_count in SPIN_COUNTS:
+            for target, password in enumerate(PASSWORDS):
+                for key_bits in (128, 256):
+                    with self.subTest(spin_count=spin_count, password=password,
+                                      key_bits=key_bits):
+                        encrypted_input, encrypted_value = make_verifier(
+                            reference_hash(password, spin_count), key_bits)
+                        matches = agile_kdf.verify_batch(
+                            SALT, PASSWORDS, spin_count, key_bits,
+                            encrypted_input, encrypted_value)
+                        self.assertEqual(matches, [target])
+
+    def test_rejects_bad_key_bits(self):
+        encrypted_input, encrypted_value = make_verifier(reference_hash(b'x', 1), 256)
+        with self.assertRaises(ValueError):
+            agile_kdf.verify_batch(SALT, PASSWORDS, 1, 100, encrypted_input, encrypted_value)
+
+
+@unittest.skipIf(agile_kdf is None, "agile_kdf extension not built")
+@unittest.skipIf('AGILE_KDF_LANES' in os.environ, "already running a narrowed kernel")
+class KernelTest(unittest.TestCase):
+    def test_narrower_kernels(self):
+        for lanes in (1, 4):
+            if lanes >= agile_kdf.LANES:
+                continue
+            with self.subTest(lanes=lanes):
+                env = dict(os.environ, AGILE_KDF_LANES=str(lanes))
+                selected = subprocess.run(
+                    [sys.executable, '-c', 'import agile_kdf; print(agile_kdf.LANES)'],
+                    cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+                self.assertEqual(int(selected.stdout), lanes)
+                result = subprocess.run(
+                    [sys.executable, '-m', 'unittest', '-q', 'test_agile_kdf.VerifyBatchTest'],
+                    cwd=Path(__file__).parent, env=env, capture_output=True, text=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
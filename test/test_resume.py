@@ -0,0 +1,100 @@
+"""Resume filters: BloomFilter and TriedPasswords"""
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import advanced_cracker
+from advanced_cracker import BloomFilter, CrackingMode, PasswordCracker, TriedPasswords
+
+DOCUMENT = Path(__file__).with_name('test.docx')
+PASSWORD = '@123711...'
+
+
+class TriedPasswordsTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_round_trip(self):
+        tried = TriedPasswords(100)
+        tried.update(b'password%d' % i for i in range(50))
+        path = self.directory / 'tried.bloom'
+        tried.save(path)
+
+        loaded = TriedPasswords.load(path, 100)
+        self.assertEqual([f.count for f in loaded.previous], [50])
+        self.assertEqual(loaded.previous[0].capacity, 100)
+        self.assertTrue(all(loaded.tried_before(b'password%d' % i) for i in range(50)))
+        self.assertFalse(loaded.tried_before(b'never tried'))
+
+    def test_current_run_is_not_tried_before(self):
+        tried = TriedPasswords(100)
+        tried.add(b'this run')
+        self.assertFalse(tried.tried_before(b'this run'))
+
+        path = self.directory / 'tried.bloom'
+        tried.save(path)
+        self.assertTrue(TriedPasswords.load(path, 100).tried_before(b'this run'))
+
+    def test_full_filter_chains_to_a_larger_one(self):
+        tried = TriedPasswords(4)
+        tried.update(b'%d' % i for i in range(5))
+        self.assertEqual([f.capacity for f in tried.filters], [4, 8])
+        self.assertEqual([f.count for f in tried.filters], [4, 1])
+
+    def test_empty_filters_are_not_saved(self):
+        tried = TriedPasswords(4)
+        path = self.directory / 'tried.bloom'
+        tried.save(path)
+        self.assertEqual(TriedPasswords.load(path, 4).previous, ())
+
+    def test_rejects_other_files(self):
+        with self.assertRaises(ValueError):
+            BloomFilter.read(b'not a bloom filter header at all')
+
+
+class ResumeCrackTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        patcher = mock.patch.object(advanced_cracker, 'RESUME_DIR', self.directory / 'resume')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.wordlist = self.directory / 'wordlist.txt'
+        self.wordlist.write_text('\n'.join(['wrong', 'also wrong', PASSWORD]) + '\n')
+
+    def cracker(self):
+        return PasswordCracker(str(DOCUMENT), str(self.wordlist),
+                               mode=CrackingMode.SINGLE, resume=True)
+
+    def test_unreadable_file_is_ignored(self):
+        cracker = self.cracker()
+        path = cracker._resume_path()
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b'garbage')
+
+        password, _, stats = cracker.crack()
+        self.assertEqual(password, PASSWORD)
+        self.assertEqual(stats.errors, [])
+        # Replaced by a readable filter
+        TriedPasswords.load(path, 1)
+
+    def test_second_run_skips_tried_passwords(self):
+        self.wordlist.write_text('wrong\nalso wrong\n')
+        self.assertIsNone(self.cracker().crack()[0])
+
+        self.wordlist.write_text('\n'.join(['wrong', 'also wrong', PASSWORD]) + '\n')
+        password, _, stats = self.cracker().crack()
+        self.assertEqual(password, PASSWORD)
+        self.assertEqual(stats.attempts, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
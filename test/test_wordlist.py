@@ -0,0 +1,110 @@
+"""Wordlist formats: frequency tables and compiled wordlists"""
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import advanced_cracker
+from advanced_cracker import CompiledWordlist, FrequencyTable, iter_wordlist_chunks
+
+PASSWORDS = [b'password', 'pässwörd'.encode(), b'x' * 300, b'dragon', b'123456']
+
+
+class FrequencyTableTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def table(self):
+        table = FrequencyTable()
+        table.add(b'123456', 1000)
+        table.add(b'password', 1000)
+        table.add(b'dragon', 3)
+        table.add('pässwörd'.encode(), 1 << 40)
+        return table
+
+    def test_round_trip(self):
+        path = self.directory / 'freq.bin'
+        self.table().save(path)
+        self.assertEqual(FrequencyTable.load(path).scores, self.table().scores)
+
+    def test_scores_are_capped(self):
+        self.assertEqual(FrequencyTable.score(1 << 40), FrequencyTable.BUCKETS - 1)
+        self.assertEqual(FrequencyTable.score(1), 1)
+
+    def test_rank(self):
+        ranked = self.table().rank([b'unlisted', b'dragon', b'password', b'other',
+                                    b'123456', 'pässwörd'.encode()])
+        # Descending score, wordlist order within a score, unlisted last
+        self.assertEqual(ranked, ['pässwörd'.encode(), b'password', b'123456',
+                                  b'dragon', b'unlisted', b'other'])
+
+    def test_rejects_other_files(self):
+        path = self.directory / 'freq.bin'
+        path.write_bytes(b'not a table')
+        with self.assertRaises(ValueError):
+            FrequencyTable.load(path)
+
+
+class CompiledWordlistTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def read(self, path):
+        return [p for chunk, _ in iter_wordlist_chunks(path) for p in chunk]
+
+    def test_round_trip(self):
+        path = self.directory / 'wordlist.wbin'
+        self.assertEqual(CompiledWordlist.write(path, PASSWORDS), len(PASSWORDS))
+        data = path.read_bytes()
+        self.assertEqual(data[:4], CompiledWordlist.MAGIC)
+        self.assertEqual(struct.unpack_from('<I', data, 4), (len(PASSWORDS),))
+        self.assertEqual(self.read(path), PASSWORDS)
+
+    def test_text_wordlist_is_not_compiled(self):
+        path = self.directory / 'wordlist.txt'
+        path.write_bytes(b'WBN\nwrong\r\nwrong\n')
+        self.assertEqual(self.read(path), [b'WBN', b'wrong'])
+
+    def test_remaining_counts_down(self):
+        path = self.directory / 'wordlist.wbin'
+        CompiledWordlist.write(path, PASSWORDS)
+        # A record or two per chunk
+        with mock.patch.object(advanced_cracker, 'READ_CHUNK_SIZE', 16):
+            chunks = list(iter_wordlist_chunks(path))
+        self.assertGreater(len(chunks), 1)
+        read = 0
+        for passwords, remaining in chunks:
+            read += len(passwords)
+            self.assertEqual(remaining, len(PASSWORDS) - read)
+        self.assertEqual(read, len(PASSWORDS))
+
+    def test_compile_tool_ranks_and_filters(self):
+        text = self.directory / 'wordlist.txt'
+        text.write_bytes(b'\n'.join(PASSWORDS + [b'password']) + b'\n')
+        freq = self.directory / 'freq.bin'
+        table = FrequencyTable()
+        table.add(b'123456', 1000)
+        table.add(b'dragon', 10)
+        table.save(freq)
+
+        compiled = self.directory / 'wordlist.wbin'
+        subprocess.run([sys.executable, str(ROOT / 'tools' / 'compile_wordlist.py'),
+                        str(text), str(compiled), '--freq-file', str(freq)],
+                       cwd=self.directory, check=True, capture_output=True)
+        # Ranked, with the duplicate and the overlong entry dropped
+        self.assertEqual(self.read(compiled), [b'123456', b'dragon', b'password',
+                                               'pässwörd'.encode()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Build a frequency table for advanced_cracker.py --freq-file
+
+Input is the output of `sort | uniq -c` over a password corpus, one
+"<count> <password>" line per password:
+
+    sort rockyou.txt | uniq -c | python tools/build_freq_table.py - freq.bin
+"""
+import argparse
+import heapq
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from advanced_cracker import FrequencyTable
+
+
+def read_counts(stream):
+    for line in stream:
+        line = line.rstrip(b'\r\n').lstrip()
+        count, _, password = line.partition(b' ')
+        if password and count.isdigit():
+            yield int(count), password
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a password frequency table")
+    parser.add_argument("counts", help="uniq -c output, or - for stdin")
+    parser.add_argument("output", help="Frequency table to write")
+    parser.add_argument("-n", "--top", type=int, default=1 << 18,
+                        help="Number of most common passwords to keep")
+    args = parser.parse_args()
+
+    with (open(args.counts, 'rb') if args.counts != '-' else sys.stdin.buffer) as stream:
+        top = heapq.nlargest(args.top, read_counts(stream), key=lambda item: item[0])
+
+    table = FrequencyTable()
+    for count, password in top:
+        table.add(password, count)
+    table.save(Path(args.output))
+    print(f"Wrote {len(table.scores)} passwords to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
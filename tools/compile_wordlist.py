@@ -0,0 +1,36 @@
+"""Compile a text wordlist for advanced_cracker.py
+
+The compiled list is deduplicated, filtered and, with a frequency table,
+ranked once, so later runs read it without parsing:
+
+    python tools/compile_wordlist.py wordlist.txt wordlist.wbin --freq-file freq.bin
+"""
+import argparse
+import itertools
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from advanced_cracker import CompiledWordlist, FrequencyTable, iter_wordlist_chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a wordlist to the packed format")
+    parser.add_argument("wordlist", help="Text wordlist, one password per line")
+    parser.add_argument("output", help="Compiled wordlist to write")
+    parser.add_argument("--freq-file",
+                        help="Frequency table to rank the most common passwords first")
+    args = parser.parse_args()
+
+    passwords = itertools.chain.from_iterable(
+        chunk for chunk, _ in iter_wordlist_chunks(Path(args.wordlist)))
+    if args.freq_file:
+        passwords = FrequencyTable.load(Path(args.freq_file)).rank(passwords)
+
+    count = CompiledWordlist.write(Path(args.output), passwords)
+    print(f"Wrote {count} passwords to {args.output}")
+
+
+if __name__ == "__main__":
+    main()